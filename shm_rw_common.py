@@ -0,0 +1,79 @@
+"""
+Shared building blocks for the shm_rw SimBricks experiment scripts
+
+Every experiment uses the same gem5 x86 host booting the shm-rw disk image and
+the same 4MB shared memory region behind a MemInterconnect. The scripts only
+differ in how the host reaches that interconnect, so the common parts of the
+system graph are built here.
+"""
+
+import logging
+import os
+
+from simbricks.orchestration import system
+from simbricks.orchestration.system import mem as sys_mem
+from simbricks.orchestration.system import host as sys_host
+
+# Informational messages of the experiment scripts; they are only shown when
+# logging is configured for INFO, so loading experiments stays quiet
+LOG = logging.getLogger("simbricks.shm_rw")
+
+# Shared memory region accessed by shm_rw_fixed_addr
+SHM_ADDR = 0x3FC0000
+SHM_SIZE = 4 << 20  # 4MB
+
+# Simulator output is only echoed by simbricks-run with SIMBRICKS_VERBOSE=1
+VERBOSE = os.environ.get("SIMBRICKS_VERBOSE", "0") == "1"
+
+# Checkpointed boots (SIMBRICKS_CHECKPOINT=1) need /dev/kvm on the runner
+CHECKPOINT = os.environ.get("SIMBRICKS_CHECKPOINT", "0") == "1"
+
+
+def build_host(sys: system.System, name: str = "x86_host", mem_mb: int = 1024,
+               freq: str = "3GHz") -> sys_host.LinuxHost:
+    host = sys_host.LinuxHost(sys)
+    host.name = name
+    host.memory = mem_mb
+    host.cores = 1
+    host.cpu_freq = freq
+
+    # The shm-rw image contains the shm_rw binaries under /home/ubuntu
+    host.add_disk(system.DistroDiskImage(sys, name="shm-rw"))
+    host.add_disk(system.LinuxConfigDiskImage(sys, host))
+    return host
+
+
+def build_shared_mem(sys: system.System, name: str = "shared_mem", addr: int = SHM_ADDR,
+                     size: int = SHM_SIZE) -> sys_mem.MemSimpleDevice:
+    dev = sys_mem.MemSimpleDevice(sys)
+    dev.name = name
+    dev._addr = addr  # Physical address used by shm_rw
+    dev._size = size
+    dev._as_id = 0
+    return dev
+
+
+def attach_mem_interconnect(sys: system.System, dev: sys_mem.MemSimpleDevice,
+                            name: str = "mem_interconnect"):
+    """
+    Create a MemInterconnect, connect dev to it and route dev's address range.
+
+    Returns the interconnect and the channel between interconnect and dev.
+    """
+    mem_interconnect = sys_mem.MemInterconnect(sys)
+    mem_interconnect.name = name
+
+    # connect_device() creates the interconnect's MemHostInterface on the other
+    # end of dev's channel, so take it from there instead of searching for it
+    channel = mem_interconnect.connect_device(dev._mem_if)
+    interconnect_host_if = dev._mem_if.get_opposing_interface()
+    assert isinstance(interconnect_host_if, sys_mem.MemHostInterface)
+
+    mem_interconnect.add_route(
+        dev=interconnect_host_if,
+        vaddr=dev._addr,  # Virtual address (same as physical in this case)
+        len=dev._size,
+        paddr=dev._addr
+    )
+    return mem_interconnect, channel
+
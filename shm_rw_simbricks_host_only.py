@@ -9,6 +9,9 @@ This script creates a single component:
 1. gem5 x86 system running shm_rw application with local memory
 """
 
+import os
+import sys as _sys
+
 from simbricks.orchestration import system
 from simbricks.orchestration import simulation as sim
 from simbricks.orchestration import instantiation as inst
@@ -17,26 +20,24 @@ from simbricks.orchestration.system import host as sys_host
 from simbricks.orchestration.system import mem as sys_mem
 from simbricks.orchestration.system import disk_images
 
+# shm_rw_common lives next to this script, which simbricks-run loads by path
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in _sys.path:
+    _sys.path.insert(0, _script_dir)
+import shm_rw_common as common
+
 # Create empty instantiations list that simbricks-run expects
 instantiations = []
 
-print("Creating experiment for x86 application running shm_rw on gem5 host-only configuration...")
-print("System architecture: Application(x86) --> gem5 x86 CPU --> Local memory system")
-print("Expected output: [shared_bmk] PASS: all 1024 bytes match")
+common.LOG.info("Creating experiment for x86 application running shm_rw on gem5 host-only configuration...")
+common.LOG.info("System architecture: Application(x86) --> gem5 x86 CPU --> Local memory system")
+common.LOG.info("Expected output: [shared_bmk] PASS: all 1024 bytes match")
 
 # Create system
 sys = system.System()
 
 # Create x86 host
-host = sys_host.LinuxHost(sys)
-host.name = "x86_host"
-host.memory = 1024  # 1GB memory
-host.cores = 1
-host.cpu_freq = "3GHz"
-
-# Add disk images - using shm-rw image which should contain the shm_rw binary
-host.add_disk(system.DistroDiskImage(sys, name="shm-rw"))
-host.add_disk(system.LinuxConfigDiskImage(sys, host))
+host = common.build_host(sys)
 
 # Configure application - run shm_rw using syscall-based version
 # The shm_rw binary should be available in the shm-rw disk image
@@ -50,8 +51,8 @@ host.add_app(shm_rw_app)
 simulation = sim.Simulation("shm_rw_gem5_host_only", sys)
 
 # Configure simulation parameters
-simulation.timeout = 600  # 30 minutes timeout for full boot and application execution
-simulation.verbose = True  # Enable verbose output for debugging
+simulation.timeout = 600  # full boot and application execution
+simulation.verbose = common.VERBOSE  # SIMBRICKS_VERBOSE=1 for debugging
 
 # Configure host sim
 host_sim = sim.Gem5Sim(simulation)
@@ -62,6 +63,12 @@ host_sim.wait_terminate = True
 # Create instantiation
 instantiation = inst_helpers.simple_instantiation(simulation)
 instantiation.preserve_tmp_folder = True
+# With SIMBRICKS_CHECKPOINT=1, boot Linux once with the KVM CPU, take a gem5
+# checkpoint and restore it with the timing CPU to run shm_rw; simbricks-run
+# adds the checkpointing run as a prerequisite and keeps the checkpoint
+# directory between the two runs. The boot run uses Gem5Sim.cpu_type_cp
+# (X86KvmCPU), so this requires /dev/kvm on the runner.
+instantiation.create_checkpoint = common.CHECKPOINT
 fragment = inst.Fragment()
 fragment.add_simulators(host_sim)
 instantiation.fragments = [fragment]
@@ -70,5 +77,5 @@ instantiation.fragments = [fragment]
 # Add to instantiations list
 instantiations.append(instantiation)
 
-print(f"Experiment created successfully, containing {len(instantiations)} instantiations")
-print("Configuration: gem5 x86 host running shm_rw application locally")
+common.LOG.info("Experiment created successfully, containing %d instantiations", len(instantiations))
+common.LOG.info("Configuration: gem5 x86 host running shm_rw application locally")
@@ -10,6 +10,9 @@ This script creates two components:
 2. External memory system (can be simple memory model or other architecture)
 """
 
+import os
+import sys as _sys
+
 from simbricks.orchestration import system
 from simbricks.orchestration import simulation as sim
 from simbricks.orchestration import instantiation as inst
@@ -18,49 +21,42 @@ from simbricks.orchestration.system import mem as sys_mem
 from simbricks.orchestration.system import host as sys_host
 from simbricks.orchestration.system import disk_images
 
+# shm_rw_common lives next to this script, which simbricks-run loads by path
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in _sys.path:
+    _sys.path.insert(0, _script_dir)
+import shm_rw_common as common
+
 # Create empty instantiations list that simbricks-run expects
 instantiations = []
 
-print("Creating experiment for x86 application accessing external memory through SimBricks...")
-print("System architecture: Application(x86) --> gem5 x86 CPU --> SimBricks interface --> Target memory system")
-print(f"Shared memory address: 0x3FC0000")
-print(f"Shared memory size: 4MB")
-print("Expected output: [shared_bmk] PASS: all 1024 bytes match")
+common.LOG.info("Creating experiment for x86 application accessing external memory through SimBricks...")
+common.LOG.info("System architecture: Application(x86) --> gem5 x86 CPU --> SimBricks interface --> Target memory system")
+common.LOG.info("Shared memory address: 0x%X", common.SHM_ADDR)
+common.LOG.info("Shared memory size: %dMB", common.SHM_SIZE >> 20)
+common.LOG.info("Expected output: [shared_bmk] PASS: all 1024 bytes match")
 
 # Create system
 sys = system.System()
 
 # Create x86 host
-host = sys_host.LinuxHost(sys)
-host.name = "x86_host"
-host.memory = 1024  # 1GB memory
-host.cores = 1
-host.cpu_freq = "3GHz"
+host = common.build_host(sys)
 
 # Note: Memory layout is handled by gem5 automatically
 # The shared memory at 0x3FC0000 should be accessible within the 1GB range
 # We'll rely on the SimBricks memory interconnect to handle the address mapping
 
-host.add_disk(system.DistroDiskImage(sys, name="shm-rw"))
-host.add_disk(system.LinuxConfigDiskImage(sys, host))
-
 # Create shared memory device
-shared_mem = sys_mem.MemSimpleDevice(sys)
-shared_mem.name = "shared_mem"
-shared_mem._addr = 0x3FC0000  # Physical address used by shm_rw
-shared_mem._size = 4 * 1024 * 1024  # 4MB
-shared_mem._as_id = 0
+shared_mem = common.build_shared_mem(sys, name="shared_mem")
 
 # x86 CPU (gem5) → MemHostInterface → BasicInterconnect → MemDeviceInterface → BasicMem
 #     ↓                    ↓                    ↓                 ↓              ↓
 #  Gem5Sim         MemHostInterface    MemInterconnect        _mem_if     MemSimpleDevice
 
-mem_interconnect = sys_mem.MemInterconnect(sys)
-mem_interconnect.name = "mem_interconnect"
-
 # Connect the interconnect to the memory device (creates MemHostInterface on interconnect)
-# This establishes the SimBricks memory connection that gem5 will detect
-interconnect_channel = mem_interconnect.connect_device(shared_mem._mem_if)
+# This establishes the SimBricks memory connection that gem5 will detect, and
+# routes the shared memory region to the device
+mem_interconnect, interconnect_channel = common.attach_mem_interconnect(sys, shared_mem)
 
 # The correct approach is to create a MemHostInterface for the host first
 # and then connect it to the interconnect
@@ -74,26 +70,9 @@ host.add_if(host_mem_if)
 # This creates a MemChannel connecting the host interface to a device interface on the interconnect
 host_mem_channel = mem_interconnect.connect_host(host_mem_if)
 
-# Add memory route for the shared memory device
-# This tells the interconnect how to route memory accesses to the device
-# Find the MemHostInterface that was created when connecting the device
-interconnect_host_if = None
-for intf in mem_interconnect.interfaces():
-    if isinstance(intf, sys_mem.MemHostInterface):
-        interconnect_host_if = intf
-        break
-
-if interconnect_host_if:
-    mem_interconnect.add_route(
-        dev=interconnect_host_if,  # The interconnect's host interface
-        vaddr=0x3FC0000,  # Virtual address (same as physical in this case)
-        len=4 * 1024 * 1024,  # Length of the memory region
-        paddr=0x3FC0000  # Physical address in the device
-    )
-
-print(f"Memory interconnect created")
-print(f"Shared memory device: addr=0x{shared_mem._addr:x}, size={shared_mem._size} bytes")
-print(f"Memory interconnect will bridge CPU accesses to external memory")
+common.LOG.info("Memory interconnect created")
+common.LOG.info("Shared memory device: addr=0x%x, size=%d bytes", shared_mem._addr, shared_mem._size)
+common.LOG.info("Memory interconnect will bridge CPU accesses to external memory")
 
 # Configure application - use correct concrete class
 shm_rw_app = sys_host.app.GenericRawCommandApplication(host)
@@ -105,12 +84,13 @@ host.add_app(shm_rw_app)
 simulation = sim.Simulation("shm_rw_simbricks_test", sys)
 
 # Configure simulation parameters to prevent early exit
-simulation.timeout = 600  # 60 seconds timeout
-simulation.verbose = True  # Enable verbose output for debugging
+simulation.timeout = 600
+simulation.verbose = common.VERBOSE  # SIMBRICKS_VERBOSE=1 for debugging
 
 # Configure component mapping
 host_sim = sim.Gem5Sim(simulation)
 host_sim.name = "x86_host_sim"
+host_sim.wait_terminate = True
 host_sim.add(host)
 
 # Create BasicInterconnect simulator for the memory interconnect
@@ -131,4 +111,4 @@ instantiation.fragments = [fragment]
 # Add to instantiations list
 instantiations.append(instantiation)
 
-print(f"Experiment created successfully, containing {len(instantiations)} instantiations")
+common.LOG.info("Experiment created successfully, containing %d instantiations", len(instantiations))
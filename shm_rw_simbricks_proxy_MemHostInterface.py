@@ -12,6 +12,9 @@ System architecture:
 Application(x86) --> gem5 x86 CPU --> Memory Controller --> BasicInterconnect --> External memory
 """
 
+import os
+import sys as _sys
+
 from simbricks.orchestration import system
 from simbricks.orchestration import simulation as sim
 from simbricks.orchestration import instantiation as inst
@@ -21,76 +24,51 @@ from simbricks.orchestration.system import host as sys_host
 from simbricks.orchestration.system import disk_images
 from simbricks.orchestration.system import base as sys_base
 
+# shm_rw_common lives next to this script, which simbricks-run loads by path
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+if _script_dir not in _sys.path:
+    _sys.path.insert(0, _script_dir)
+import shm_rw_common as common
+
 # Create empty instantiations list that simbricks-run expects
 instantiations = []
 
-print("Creating memory proxy component experiment...")
-print("System architecture: Host → Memory Controller → BasicInterconnect → External memory")
-print(f"Shared memory address: 0x3FC0000")
-print(f"Shared memory size: 4MB")
-print("Expected output: [shared_bmk] PASS: all 1024 bytes match")
+common.LOG.info("Creating memory proxy component experiment...")
+common.LOG.info("System architecture: Host → Memory Controller → BasicInterconnect → External memory")
+common.LOG.info("Shared memory address: 0x%X", common.SHM_ADDR)
+common.LOG.info("Shared memory size: %dMB", common.SHM_SIZE >> 20)
+common.LOG.info("Expected output: [shared_bmk] PASS: all 1024 bytes match")
 
 # Create system
 sys = system.System()
 
 # Create x86 host
-host = sys_host.LinuxHost(sys)
-host.name = "x86_host"
-host.memory = 1024  # 1GB memory
-host.cores = 1
-host.cpu_freq = "3GHz"
-
-host.add_disk(system.DistroDiskImage(sys, name="shm-rw"))
-host.add_disk(system.LinuxConfigDiskImage(sys, host))
+host = common.build_host(sys)
 
 # Create external memory device
-external_mem = sys_mem.MemSimpleDevice(sys)
-external_mem.name = "external_mem"
-external_mem._addr = 0x3FC0000  # Physical address used by shm_rw
-external_mem._size = 4 * 1024 * 1024  # 4MB
-external_mem._as_id = 0
+external_mem = common.build_shared_mem(sys, name="external_mem")
 
 # Create memory proxy/controller component
 # This component will sit between the host and interconnect
 # It will have the MemHostInterface that Gem5Sim processes
-class MemoryProxy(sys_base.Component):
-    def __init__(self, s: sys_base.System):
-        super().__init__(s)
-        self.name = "memory_proxy"
-        # Create a MemHostInterface that Gem5Sim will process
-        self._mem_if = sys_mem.MemHostInterface(self)
-        self._mem_if.name = "proxy_mem_if"
-        self.add_if(self._mem_if)
-
-# Create the memory proxy component
-mem_proxy = MemoryProxy(sys)
+# Plain base-class instances are used instead of script-local subclasses, which
+# fromJSON could not resolve when simbricks-run copies the instantiation
+mem_proxy = sys_base.Component(sys)
+mem_proxy.name = "memory_proxy"
 
-# Create memory interconnect for external memory access
-mem_interconnect = sys_mem.MemInterconnect(sys)
-mem_interconnect.name = "mem_interconnect"
+# Create a MemHostInterface that Gem5Sim will process
+mem_proxy._mem_if = sys_mem.MemHostInterface(mem_proxy)
+mem_proxy._mem_if.name = "proxy_mem_if"
+mem_proxy.add_if(mem_proxy._mem_if)
 
-# Connect the interconnect to the external memory device
-interconnect_channel = mem_interconnect.connect_device(external_mem._mem_if)
+# Create memory interconnect for external memory access, connected to the
+# external memory device
+mem_interconnect, interconnect_channel = common.attach_mem_interconnect(sys, external_mem)
 
 # Connect the memory proxy to the interconnect
 # This creates a MemDeviceInterface on the interconnect
 proxy_channel = mem_interconnect.connect_host(mem_proxy._mem_if)
 
-# Add memory route for the external memory device
-interconnect_host_if = None
-for intf in mem_interconnect.interfaces():
-    if isinstance(intf, sys_mem.MemHostInterface):
-        interconnect_host_if = intf
-        break
-
-if interconnect_host_if:
-    mem_interconnect.add_route(
-        dev=interconnect_host_if,
-        vaddr=0x3FC0000,
-        len=4 * 1024 * 1024,
-        paddr=0x3FC0000
-    )
-
 # Now connect the host to the memory proxy
 # This creates a special connection that doesn't use MemHostInterface directly
 # The host will access memory through the proxy component
@@ -98,30 +76,22 @@ if interconnect_host_if:
 # For this to work, we need to establish a connection between host and proxy
 # Let's try using a custom interface or channel that Gem5Sim doesn't process as memory
 
-# Create a custom interface for host-to-proxy communication
-class HostProxyInterface(sys_base.Interface):
-    def __init__(self, c: sys_base.Component):
-        super().__init__(c)
-
+# Create a generic interface for host-to-proxy communication
 # Add this interface to both host and proxy
-host_proxy_if = HostProxyInterface(host)
+host_proxy_if = sys_base.Interface(host)
 host_proxy_if.name = "host_proxy_if"
 host.add_if(host_proxy_if)
 
-proxy_host_if = HostProxyInterface(mem_proxy)
+proxy_host_if = sys_base.Interface(mem_proxy)
 proxy_host_if.name = "proxy_host_if"
 mem_proxy.add_if(proxy_host_if)
 
-# Connect them with a custom channel
-class HostProxyChannel(sys_base.Channel):
-    def __init__(self, host_if: HostProxyInterface, proxy_if: HostProxyInterface):
-        super().__init__(host_if, proxy_if)
-
-host_proxy_channel = HostProxyChannel(host_proxy_if, proxy_host_if)
+# Connect them with a generic channel
+host_proxy_channel = sys_base.Channel(host_proxy_if, proxy_host_if)
 
-print(f"Memory proxy component created")
-print(f"External memory device: addr=0x{external_mem._addr:x}, size={external_mem._size} bytes")
-print(f"Memory proxy will bridge host accesses to external memory through interconnect")
+common.LOG.info("Memory proxy component created")
+common.LOG.info("External memory device: addr=0x%x, size=%d bytes", external_mem._addr, external_mem._size)
+common.LOG.info("Memory proxy will bridge host accesses to external memory through interconnect")
 
 # Configure application
 shm_rw_app = sys_host.app.GenericRawCommandApplication(host)
@@ -132,11 +102,12 @@ host.add_app(shm_rw_app)
 # Create simulation configuration
 simulation = sim.Simulation("shm_rw_simbricks_proxy_test", sys)
 simulation.timeout = 60
-simulation.verbose = True
+simulation.verbose = common.VERBOSE
 
 # Configure component mapping
 host_sim = sim.Gem5Sim(simulation)
 host_sim.name = "x86_host_sim"
+host_sim.wait_terminate = True
 host_sim.add(host)
 
 # Add the memory proxy component to the same simulator as the host
@@ -162,5 +133,5 @@ instantiation.fragments = [fragment]
 # Add to instantiations list
 instantiations.append(instantiation)
 
-print(f"Memory proxy component experiment created successfully, containing {len(instantiations)} instantiations")
-print("This approach isolates the MemHostInterface from the LinuxHost while providing external memory access")
+common.LOG.info("Memory proxy component experiment created successfully, containing %d instantiations", len(instantiations))
+common.LOG.info("This approach isolates the MemHostInterface from the LinuxHost while providing external memory access")
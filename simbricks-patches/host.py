@@ -23,9 +23,15 @@
 from __future__ import annotations
 
 import abc
+import asyncio
+import functools
+import logging
 import math
+import os
 import pathlib
-import shutil
+import re
+import shlex
+import typing
 import typing_extensions as tpe
 
 import simbricks.orchestration.simulation.base as sim_base
@@ -38,14 +44,47 @@ from simbricks.orchestration.system import disk_images
 from simbricks.utils import base as utils_base, file as utils_file
 from simbricks.orchestration.instantiation import socket as inst_socket
 
+_LOG = logging.getLogger(__name__)
+
+T = typing.TypeVar("T")
+
+# Cache hierarchy and memory of the simulated gem5 machine
+_GEM5_CACHE_FLAGS = (
+    "--caches", "--l2cache",
+    "--l1d_size=32kB", "--l1i_size=32kB", "--l2_size=32MB",
+    "--l1d_assoc=8", "--l1i_assoc=8", "--l2_assoc=16",
+    "--cacheline_size=64",
+)
+_GEM5_MEM_TYPE = "--mem-type=DDR4_2400_16x4"
+
+# The number is anything float() accepts, followed directly by the unit
+_CPU_FREQ_RE = re.compile(r"(.*)(GHz|MHz)", re.IGNORECASE | re.DOTALL)
+# Exponent of each unit relative to GHz, as used for the QEMU icount shift
+_CPU_FREQ_UNIT_BASE = {"ghz": 0, "mhz": 3}
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_cpu_freq(freq: str) -> tuple[float, int]:
+    """Split a cpu frequency such as "3GHz" into its number and unit base."""
+    match = _CPU_FREQ_RE.fullmatch(freq)
+    if match is None:
+        raise ValueError("cpu frequency specified in unsupported unit")
+    num = float(match.group(1))
+    if not 0 < num < math.inf:
+        raise ValueError("cpu frequency must be a positive finite number")
+    return num, _CPU_FREQ_UNIT_BASE[match.group(2).lower()]
+
 
 class HostSim(sim_base.Simulator):
 
     def __init__(self, simulation: sim_base.Simulation, executable: str, name=""):
         super().__init__(simulation=simulation, executable=executable, name=name)
+        # (disk, path, format of the original disk image) per host
         self._disk_images: dict[
-            sys_host.FullSystemHost, list[tuple[disk_images.DiskImage, str]]
+            sys_host.FullSystemHost, list[tuple[disk_images.DiskImage, str, str]]
         ] = {}
+        self._format_cache: dict[int, str] = {}
+        self._components_by_type: dict[type, list] = {}
 
     def toJSON(self) -> dict:
         return super().toJSON()
@@ -54,6 +93,8 @@ class HostSim(sim_base.Simulator):
     def fromJSON(cls, simulation: sim_base.Simulation, json_obj: dict) -> tpe.Self:
         instance = super().fromJSON(simulation, json_obj)
         instance._disk_images = {}
+        instance._format_cache = {}
+        instance._components_by_type = {}
         return instance
 
     def full_name(self) -> str:
@@ -61,52 +102,119 @@ class HostSim(sim_base.Simulator):
 
     def add(self, host: sys_host.Host):
         super().add(host)
+        # Only add() resets the lookup cache of filter_components_by_type(),
+        # code that changes _components directly has to reset it as well
+        self._components_by_type = {}
+
+    def filter_components_by_type(self, ty: type[T]) -> list[T]:
+        # prepare() and run_cmd() repeatedly look up the same types, so
+        # remember the results; callers get their own copy of the list
+        comps = self._components_by_type.get(ty)
+        if comps is None:
+            comps = self._components_by_type[ty] = super().filter_components_by_type(ty)
+        return list(comps)
+
+    def single_component_by_type(self, ty: type[T], error: str) -> T:
+        """Return the only component of type ty, raise Exception(error) otherwise."""
+        it = iter(self.filter_components_by_type(ty))
+        first = next(it, None)
+        if first is None or next(it, None) is not None:
+            raise Exception(error)
+        return first
 
     @abc.abstractmethod
     def supported_image_formats(self) -> list[str]:
         pass
 
+    def _format(self, disk: disk_images.DiskImage) -> str:
+        # The format chosen for a disk only depends on the disk and this
+        # simulator's supported formats, so only look it up once
+        fmt = self._format_cache.get(id(disk))
+        if fmt is None:
+            fmt = self._format_cache[id(disk)] = disk.find_format(self)
+        return fmt
+
     @abc.abstractmethod
     async def copy_disk_image(
         self, inst: inst_base.Instantiation, disk_image: disk_images.DiskImage, ident: str
     ) -> str:
         pass
 
+    async def _copy_disks(
+        self,
+        inst: inst_base.Instantiation,
+        copies: list[tuple[sys_host.FullSystemHost, int, disk_images.DiskImage]],
+    ) -> dict[tuple[sys_host.FullSystemHost, int], str]:
+        # Copies go to distinct per-host/per-disk paths, so run all of them
+        # concurrently
+        tasks = []
+        try:
+            for host, i, disk in copies:
+                tasks.append(
+                    asyncio.create_task(self.copy_disk_image(inst, disk, f"{host.id()}.{i}"))
+                )
+            copy_paths = await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the remaining copies and collect their results, so that no
+            # qemu-img keeps running and no task exception goes unretrieved
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        copy_path_of = {}
+        for (host, i, _), copy_path in zip(copies, copy_paths):
+            _LOG.debug("Disk %d copy path: %s", i, copy_path)
+            copy_path_of[(host, i)] = copy_path
+        return copy_path_of
+
     async def prepare(self, inst: inst_base.Instantiation):
         await super().prepare(inst)
 
-        print(f"DEBUG: HostSim.prepare() called for simulator {self.name}")
+        _LOG.debug("HostSim.prepare() called for simulator %s", self.name)
 
         full_sys_hosts = self.filter_components_by_type(ty=sys_host.FullSystemHost)
-        print(f"DEBUG: Found {len(full_sys_hosts)} FullSystemHost(s)")
-
+        _LOG.debug("Found %d FullSystemHost(s)", len(full_sys_hosts))
+        if not full_sys_hosts:
+            return
+
+        # Resolve format and path of every disk before starting any copy, so
+        # that a failing lookup cannot leave copies of earlier disks running.
+        # The path is None for disks that still need to be copied.
+        resolved: list[
+            tuple[sys_host.FullSystemHost, list[tuple[disk_images.DiskImage, str | None, str]]]
+        ] = []
+        copies: list[tuple[sys_host.FullSystemHost, int, disk_images.DiskImage]] = []
         for host in full_sys_hosts:
-            print(f"DEBUG: Processing host: {host.name} (ID: {host.id()})")
-            print(f"DEBUG: Host has {len(host.disks)} disk(s)")
-            
+            _LOG.debug("Processing host: %s (ID: %s) with %d disk(s)", host.name, host.id(),
+                       len(host.disks))
+
             host_disks = []
+            resolved.append((host, host_disks))
             for i, disk in enumerate(host.disks):
-                disk_format = disk.find_format(self)
                 needs_copy = disk.needs_copy
-                
-                print(f"DEBUG: Disk {i}:")
-                print(f"DEBUG:   - Disk object: {disk}")
-                print(f"DEBUG:   - Needs copy: {needs_copy}")
-                print(f"DEBUG:   - Format: {disk_format}")
-                
-                if disk.needs_copy:
-                    copy_path = await self.copy_disk_image(inst, disk, f"{host.id()}.{i}")
-                    print(f"DEBUG:   - Copy path: {copy_path}")
-                    host_disks.append((disk, copy_path))
+                disk_format = self._format(disk)
+                _LOG.debug("Disk %d: %s, needs copy: %s, format: %s", i, disk, needs_copy,
+                           disk_format)
+
+                if needs_copy:
+                    copies.append((host, i, disk))
+                    host_disks.append((disk, None, disk_format))
                 else:
-                    original_path = disk.path(inst, disk.find_format(self))
-                    print(f"DEBUG:   - Original path: {original_path}")
-                    host_disks.append((disk, original_path))
-            
-            self._disk_images[host] = host_disks
-            print(f"DEBUG: Finished processing host {host.name}, stored {len(host_disks)} disk entries")
-        
-        print("DEBUG: HostSim.prepare() completed")
+                    original_path = disk.path(inst, disk_format)
+                    _LOG.debug("Disk %d original path: %s", i, original_path)
+                    host_disks.append((disk, original_path, disk_format))
+
+        copy_path_of = await self._copy_disks(inst, copies) if copies else {}
+
+        # Only store complete disk lists
+        for host, host_disks in resolved:
+            self._disk_images[host] = [
+                (disk, copy_path_of[(host, i)] if path is None else path, disk_format)
+                for i, (disk, path, disk_format) in enumerate(host_disks)
+            ]
+
+        _LOG.debug("HostSim.prepare() completed, %d disk copies made", len(copies))
 
     def supported_socket_types(
         self, interface: system.Interface
@@ -168,7 +276,7 @@ class Gem5Sim(HostSim):
     async def copy_disk_image(
         self, inst: inst_base.Instantiation, disk_image: disk_images.DiskImage, ident: str
     ):
-        return disk_image.path(inst, disk_image.find_format(self))
+        return disk_image.path(inst, self._format(disk_image))
 
     async def prepare(self, inst: inst_base.Instantiation) -> None:
         await super().prepare(inst=inst)
@@ -181,149 +289,148 @@ class Gem5Sim(HostSim):
         return ["m5 exit"]
 
     def run_cmd(self, inst: inst_base.Instantiation) -> str:
-        print(f"DEBUG: Gem5Sim.run_cmd() called for simulator {self.name}")
-        print(f"DEBUG: Instantiation: {inst.simulation.name}")
-        
+        cmd = shlex.join(self.run_argv(inst))
+        _LOG.debug("Final Gem5 command: %s", cmd)
+        return cmd
+
+    def run_argv(self, inst: inst_base.Instantiation) -> list[str]:
+        _LOG.debug("Gem5Sim.run_argv() called for simulator %s, instantiation %s", self.name,
+                   inst.simulation.name)
+
         cpu_type = self.cpu_type
         if inst.create_checkpoint:
             cpu_type = self.cpu_type_cp
 
-        full_sys_hosts = self.filter_components_by_type(ty=sys_host.BaseLinuxHost)
-        if len(full_sys_hosts) != 1:
-            raise Exception("Gem5Sim only supports simulating 1 FullSystemHost")
-        host_spec = full_sys_hosts[0]
-        
-        print(f"DEBUG: Found host: {host_spec.name}")
-
-        cmd = f"{inst.env.repo_base(f'{self._executable}.{self._variant}')} --outdir={inst.env.get_simulator_output_dir(sim=self)} "
-        cmd += " ".join(self.extra_main_args)
-        cmd += (
-            f" {inst.env.repo_base('sims/external/gem5/configs/simbricks/simbricks.py')} --caches --l2cache "
-            "--l1d_size=32kB --l1i_size=32kB --l2_size=32MB "
-            "--l1d_assoc=8 --l1i_assoc=8 --l2_assoc=16 "
-            f"--cacheline_size=64 --cpu-clock={host_spec.cpu_freq}"
-            f" --sys-clock={self._sys_clock} "
-            f"--checkpoint-dir={inst.env.cpdir_sim(sim=self)} "
-            f"--kernel={inst.env.repo_base('images/vmlinux')} "
+        host_spec = self.single_component_by_type(
+            sys_host.BaseLinuxHost, "Gem5Sim only supports simulating 1 FullSystemHost"
         )
+        _LOG.debug("Found host: %s", host_spec.name)
+
+        exec_path = inst.env.repo_base(f"{self._executable}.{self._variant}")
+        outdir = inst.env.get_simulator_output_dir(sim=self)
+        config_path = inst.env.repo_base("sims/external/gem5/configs/simbricks/simbricks.py")
+        cpdir = inst.env.cpdir_sim(sim=self)
+        kernel_path = inst.env.repo_base("images/vmlinux")
+
+        # extra_*_args entries may hold several shell-quoted arguments each
+        argv: list[str] = [exec_path, f"--outdir={outdir}"]
+        for arg in self.extra_main_args:
+            argv.extend(shlex.split(arg))
+        argv.append(config_path)
+        argv.extend(_GEM5_CACHE_FLAGS)
+        argv.extend([
+            f"--cpu-clock={host_spec.cpu_freq}",
+            f"--sys-clock={self._sys_clock}",
+            f"--checkpoint-dir={cpdir}",
+            f"--kernel={kernel_path}",
+        ])
 
         assert host_spec in self._disk_images
 
         # Validate disk image files exist before proceeding
-        print(f"DEBUG: Validating disk image files for Gem5Sim...")
         for i, disk in enumerate(self._disk_images[host_spec]):
             disk_path = disk[1]
-            print(f"DEBUG: Checking disk {i}: {disk_path}")
-            if not pathlib.Path(disk_path).exists():
-                print(f"DEBUG: ERROR - Disk file does not exist: {disk_path}")
-                raise RuntimeError(f"Gem5Sim disk image file not found: {disk_path}")
-            else:
-                print(f"DEBUG: Disk file exists: {disk_path}")
-                file_size = pathlib.Path(disk_path).stat().st_size
-                print(f"DEBUG: Disk file size: {file_size} bytes")
+            try:
+                st = os.stat(disk_path)
+            except FileNotFoundError:
+                raise RuntimeError(f"Gem5Sim disk image file not found: {disk_path}") from None
+            _LOG.debug("Disk %d exists: %s (%d bytes)", i, disk_path, st.st_size)
 
         for disk in self._disk_images[host_spec]:
-            cmd += f"--disk-image={disk[1]} "
+            argv.append(f"--disk-image={disk[1]}")
 
-        cmd += (
-            f"--cpu-type={cpu_type} --mem-size={host_spec.memory}MB "
-            f"--num-cpus={host_spec.cores} "
-            "--mem-type=DDR4_2400_16x4 "
-        )
+        argv.extend([
+            f"--cpu-type={cpu_type}",
+            f"--mem-size={host_spec.memory}MB",
+            f"--num-cpus={host_spec.cores}",
+            _GEM5_MEM_TYPE,
+        ])
 
         if host_spec.kcmd_append is not None:
-            cmd += f'--command-line-append="{host_spec.kcmd_append}" '
+            argv.append(f"--command-line-append={host_spec.kcmd_append}")
 
         if inst.create_checkpoint:
-            cmd += "--max-checkpoints=1 "
+            argv.append("--max-checkpoints=1")
 
         if inst.restore_checkpoint:
-            cmd += "-r 1 "
+            argv.extend(["-r", "1"])
 
-        fsh_interfaces = host_spec.interfaces()
+        # Sort the host's interfaces by kind in a single pass
+        pci_interfaces: list[sys_pcie.PCIeHostInterface] = []
+        mem_interfaces: list[sys_mem.MemHostInterface] = []
+        for inf in host_spec.interfaces():
+            if isinstance(inf, sys_pcie.PCIeHostInterface):
+                pci_interfaces.append(inf)
+            elif isinstance(inf, sys_mem.MemHostInterface):
+                mem_interfaces.append(inf)
 
-        # Only calculate latency/sync parameters if there are actual interfaces
-        pci_interfaces = system.Interface.filter_by_type(
-            interfaces=fsh_interfaces, ty=sys_pcie.PCIeHostInterface
-        )
-        mem_interfaces = system.Interface.filter_by_type(
-            interfaces=fsh_interfaces, ty=sys_mem.MemHostInterface
-        )
-        
         # Only determine latency/sync if there are interfaces that need them
-        print(f"DEBUG: pci_interfaces count: {len(pci_interfaces)}, mem_interfaces count: {len(mem_interfaces)}, channels count: {len(self.get_channels())}")
-        if pci_interfaces or mem_interfaces or self.get_channels():
+        channels = self.get_channels()
+        if pci_interfaces or mem_interfaces or channels:
             latency, sync_period, run_sync = (
-                sim_base.Simulator.get_unique_latency_period_sync(
-                    channels=self.get_channels()
-                )
+                sim_base.Simulator.get_unique_latency_period_sync(channels=channels)
             )
-            print(f"DEBUG: Calculated latency={latency}, sync_period={sync_period}, run_sync={run_sync}")
+            _LOG.debug("Calculated latency=%s, sync_period=%s, run_sync=%s", latency, sync_period,
+                       run_sync)
         else:
             # No interfaces means no external communication needed
             latency = sync_period = run_sync = None
-            print(f"DEBUG: No PCI or memory interfaces found, skipping latency/sync parameters")
+            _LOG.debug("No PCI or memory interfaces found, skipping latency/sync parameters")
+
+        # Common tail of all --simbricks-pci/--simbricks-mem arguments
+        lat_sync_suffix = f":latency={latency}ns:sync_interval={sync_period}ns"
+        if run_sync and not inst.create_checkpoint:
+            lat_sync_suffix += ":sync"
+
+        def _pci_arg(path: str) -> str:
+            return f"--simbricks-pci=connect:{path}{lat_sync_suffix}"
+
+        def _mem_arg(dev: sys_mem.MemSimpleDevice, path: str) -> str:
+            return (
+                f"--simbricks-mem={dev._size}@{dev._addr}@{dev._as_id}@"
+                f"connect:{path}{lat_sync_suffix}"
+            )
 
         for inf in pci_interfaces:
             socket = inst.get_socket(interface=inf)
             if socket is None:
                 continue
             assert socket._type == inst_socket.SockType.CONNECT
-            cmd += (
-                f"--simbricks-pci=connect:{socket._path}"
-                f":latency={latency}ns"
-                f":sync_interval={sync_period}ns"
-            )
-            if run_sync and not inst.create_checkpoint:
-                cmd += ":sync"
-            cmd += " "
+            argv.append(_pci_arg(socket._path))
 
         for inf in mem_interfaces:
             socket = inst.get_socket(interface=inf)
             if socket is None:
                 continue
             assert socket._type == inst_socket.SockType.CONNECT
-            utils_base.has_expected_type(inf.component, sys_mem.MemSimpleDevice)
-            dev: sys_mem.MemSimpleDevice = inf.component
-            cmd += (
-                f"--simbricks-mem={dev._size}@{dev._addr}@{dev._as_id}@"
-                f"connect:{socket._path}"
-                f":latency={latency}ns"
-                f":sync_interval={sync_period}ns"
-            )
-            if run_sync and not inst.create_checkpoint:
-                cmd += ":sync"
-            cmd += " "
+            dev = inf.component
+            assert isinstance(dev, sys_mem.MemSimpleDevice)
+            argv.append(_mem_arg(dev, socket._path))
 
         # Handle MemSimpleDevice components in this simulator (like memory proxy)
         mem_devices = self.filter_components_by_type(ty=sys_mem.MemSimpleDevice)
-        print(f"DEBUG: Found {len(mem_devices)} MemSimpleDevice(s) in this simulator")
+        _LOG.debug("Found %d MemSimpleDevice(s) in this simulator", len(mem_devices))
+        handled = {id(inf.component) for inf in mem_interfaces}
         for dev in mem_devices:
             # Skip if this device was already processed via a MemHostInterface
             # (though unlikely in this context, we check)
-            if any(inf.component is dev for inf in mem_interfaces):
-                print(f"DEBUG: Device {dev.name} (id={dev.id()}) already processed via MemHostInterface, skipping")
+            if id(dev) in handled:
+                _LOG.debug("Device %s (id=%s) already processed via MemHostInterface, skipping",
+                           dev.name, dev.id())
                 continue
             # Get the MemDeviceInterface of the device
             mem_if = dev._mem_if
-            print(f"DEBUG: Processing device {dev.name} (id={dev.id()}), addr={dev._addr}, size={dev._size}, as_id={dev._as_id}")
-            print(f"DEBUG: MemDeviceInterface id: {mem_if.id()}")
+            _LOG.debug("Processing device %s (id=%s), addr=%s, size=%s, as_id=%s, "
+                       "MemDeviceInterface id=%s", dev.name, dev.id(), dev._addr, dev._size,
+                       dev._as_id, mem_if.id())
             socket = inst.get_socket(interface=mem_if)
             if socket is None:
-                print(f"DEBUG: No socket found for MemDeviceInterface {mem_if.id()}")
+                _LOG.debug("No socket found for MemDeviceInterface %s", mem_if.id())
                 continue
-            print(f"DEBUG: Found socket: path={socket._path}, type={socket._type}")
+            _LOG.debug("Found socket: path=%s, type=%s", socket._path, socket._type)
             assert socket._type == inst_socket.SockType.CONNECT
-            cmd += (
-                f"--simbricks-mem={dev._size}@{dev._addr}@{dev._as_id}@"
-                f"connect:{socket._path}"
-                f":latency={latency}ns"
-                f":sync_interval={sync_period}ns"
-            )
-            if run_sync and not inst.create_checkpoint:
-                cmd += ":sync"
-            cmd += " "
-            print(f"DEBUG: Added --simbricks-mem flag for device {dev.name}")
+            argv.append(_mem_arg(dev, socket._path))
+            _LOG.debug("Added --simbricks-mem flag for device %s", dev.name)
 
         # TODO: FIXME
         # for net in self.net_directs:
@@ -338,10 +445,10 @@ class Gem5Sim(HostSim):
         #         cmd += ':sync'
         #     cmd += ' '
 
-        cmd += " ".join(self.extra_config_args)
+        for arg in self.extra_config_args:
+            argv.extend(shlex.split(arg))
 
-        print(f"DEBUG: Final Gem5 command: {cmd}")
-        return cmd
+        return argv
 
 
 class QemuSim(HostSim):
@@ -382,30 +489,20 @@ class QemuSim(HostSim):
         copy_path = inst.env.img_dir(relative_path=f"hdcopy.{self._id}.{ident}")
         prep_cmds = [
             (
-                f"{inst.env.repo_base(relative_path=self._qemu_img_exec)} create -f qcow2 -F qcow2 "
-                f'-o backing_file="{disk_path}" '
+                f"{inst.env.repo_base(relative_path=self._qemu_img_exec)} create -f qcow2 "
+                f'-F {format} -b "{disk_path}" '
                 f"{copy_path}"
             )
         ]
         await inst._cmd_executor.exec_simulator_prepare_cmds(self, prep_cmds)
         return copy_path
 
-    async def _make_raw_copy(
-        self, inst: inst_base.Instantiation, disk: disk_images.DiskImage, format: str, ident: str
-    ) -> str:
-        disk_path = pathlib.Path(disk.path(inst=inst, format=format))
-        copy_path = inst.env.img_dir(relative_path=f"hdcopy.{self._id}.{ident}")
-        shutil.copy2(disk_path, copy_path)
-        return copy_path
-
     async def copy_disk_image(
         self, inst: inst_base.Instantiation, disk_image: disk_images.DiskImage, ident: str
     ) -> str:
-        format = disk_image.find_format(self)
-        if format == "qcow2":
-            return await self._make_qcow_copy(inst, disk_image, format, ident)
-        else:
-            return await self._make_raw_copy(inst, disk_image, format, ident)
+        # Copies are qcow2 overlays backed by the original image in any format,
+        # only blocks written by the guest end up in the copy
+        return await self._make_qcow_copy(inst, disk_image, self._format(disk_image), ident)
 
     def checkpoint_commands(self) -> list[str]:
         return []
@@ -414,13 +511,15 @@ class QemuSim(HostSim):
         return ["poweroff -f"]
 
     def run_cmd(self, inst: inst_base.Instantiation) -> str:
-        print(f"DEBUG: QemuSim.run_cmd() called for simulator {self.name}")
-        
-        full_sys_hosts = self.filter_components_by_type(ty=sys_host.BaseLinuxHost)
-        if len(full_sys_hosts) != 1:
-            raise Exception("QEMU only supports simulating 1 FullSystemHost")
-        host_spec = full_sys_hosts[0]
-        
+        return shlex.join(self.run_argv(inst))
+
+    def run_argv(self, inst: inst_base.Instantiation) -> list[str]:
+        _LOG.debug("QemuSim.run_argv() called for simulator %s", self.name)
+
+        host_spec = self.single_component_by_type(
+            sys_host.BaseLinuxHost, "QEMU only supports simulating 1 FullSystemHost"
+        )
+
         # Only calculate latency/sync parameters if there are actual interfaces
         fsh_interfaces = host_spec.interfaces()
         pci_interfaces = system.Interface.filter_by_type(
@@ -435,15 +534,18 @@ class QemuSim(HostSim):
         else:
             # No interfaces means no external communication needed
             latency = period = sync = None
-            print(f"DEBUG: No PCI interfaces found, skipping latency/sync parameters")
+            _LOG.debug("No PCI interfaces found, skipping latency/sync parameters")
 
         accel = ",accel=kvm:tcg" if not sync else ""
 
-        cmd = (
-            f"{inst.env.repo_base(relative_path=self._executable)} -machine q35{accel} -serial mon:stdio "
-            "-cpu Skylake-Server -display none -nic none "
-            f"-kernel {inst.env.repo_base('images/bzImage')} "
-        )
+        exec_path = inst.env.repo_base(relative_path=self._executable)
+        kernel_path = inst.env.repo_base("images/bzImage")
+
+        argv: list[str] = [
+            exec_path, "-machine", f"q35{accel}", "-serial", "mon:stdio",
+            "-cpu", "Skylake-Server", "-display", "none", "-nic", "none",
+            "-kernel", kernel_path,
+        ]
 
         kcmd_append = ""
         if host_spec.kcmd_append is not None:
@@ -451,39 +553,35 @@ class QemuSim(HostSim):
 
         assert host_spec in self._disk_images
         for index, disk in enumerate(self._disk_images[host_spec]):
-            format = disk[0].find_format(self)
-            cmd += f"-drive file={disk[1]},if=ide,index={index},media=disk,driver={format} "
-        cmd += (
-            '-append "earlyprintk=ttyS0 console=ttyS0 root=/dev/sda1 '
-            f'init=/home/ubuntu/guestinit.sh rw{kcmd_append}" '
-            f"-m {host_spec.memory} -smp {host_spec.cores} "
-        )
+            # Copied disks are qcow2 overlays, see copy_disk_image()
+            format = "qcow2" if disk[0].needs_copy else disk[2]
+            argv.extend(
+                ["-drive", f"file={disk[1]},if=ide,index={index},media=disk,driver={format}"]
+            )
+        argv.extend([
+            "-append",
+            "earlyprintk=ttyS0 console=ttyS0 root=/dev/sda1 "
+            f"init=/home/ubuntu/guestinit.sh rw{kcmd_append}",
+            "-m", str(host_spec.memory), "-smp", str(host_spec.cores),
+        ])
 
         if sync:
-            unit = host_spec.cpu_freq[-3:]
-            if unit.lower() == "ghz":
-                base = 0
-            elif unit.lower() == "mhz":
-                base = 3
-            else:
-                raise ValueError("cpu frequency specified in unsupported unit")
-            num = float(host_spec.cpu_freq[:-3])
-            shift = base - int(math.ceil(math.log(num, 2)))
-
-            cmd += f" -icount shift={shift},sleep=off "
+            num, base = _parse_cpu_freq(host_spec.cpu_freq)
+            # Exact ceil(log2(num)): num == m * 2**e with 0.5 <= m < 1, so only
+            # powers of two (m == 0.5) need rounding down
+            m, e = math.frexp(num)
+            shift = base - (e - 1 if m == 0.5 else e)
+
+            argv.extend(["-icount", f"shift={shift},sleep=off"])
+            sync_suffix = f",sync=on,pci-latency={latency},sync-period={period}"
+        else:
+            sync_suffix = ",sync=off"
 
         for inf in pci_interfaces:
             socket = inst.get_socket(interface=inf)
             if socket is None:
                 continue
             assert socket._type is inst_socket.SockType.CONNECT
-            cmd += f"-device simbricks-pci,socket={socket._path}"
-            if sync:
-                cmd += ",sync=on"
-                cmd += f",pci-latency={latency}"
-                cmd += f",sync-period={period}"
-            else:
-                cmd += ",sync=off"
-            cmd += " "
+            argv.extend(["-device", f"simbricks-pci,socket={socket._path}{sync_suffix}"])
 
-        return cmd
+        return argv